@@ -2,49 +2,38 @@
 """sqlite3 database utility functions"""
 
 import sqlite3
-import os.path
+import os
+from collections import namedtuple
 from configparser import ConfigParser, NoOptionError
 from contextlib import contextmanager
+from itertools import chain
 
 INI_PATH = "/etc/pihole/pihole-FTL.conf"
 DB_PATH_KEY = "GRAVITYDB"
+DB_PATH_ENV = "PIHOLE_GRAVITY_DB"
 DEFAULT_DB_PATH = "/etc/pihole/gravity.db"
 DUMMY_HEAD = "DummyHead"
-
-
-class FakeIniHeader:
-    """Pihole config wrapper. Adds dummy section head that `ConfigParser`
-    requires
-
-    Properties:
-        file      (io.TextIOWrapper): The actual file hander
-        head_read (bool)            : Whether the section head is read
-    """
-
-    def __init__(self, file):
-        self.file = file
-
-    def __iter__(self):
-        self.head_read = False
-        return self
-
-    def __next__(self):
-        if not self.head_read:
-            self.head_read = True
-            return "[{}]\n".format(DUMMY_HEAD)
-        line = self.file.readline()
-        if not line:
-            raise StopIteration
-        return line
-
-
-if not os.path.isfile(INI_PATH):
+INDEX_STMTS = (
+    "CREATE INDEX IF NOT EXISTS idx_domainlist_by_group_group_id_domainlist_id ON domainlist_by_group(group_id, domainlist_id)",
+)
+PRAGMA_STMTS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=134217728",
+)
+MAX_SQL_VARIABLES = 999
+STATEMENT_CACHE_SIZE = 256
+IN_LIST_SENTINEL = -1
+
+
+if os.environ.get(DB_PATH_ENV):
+    DB_PATH = os.environ[DB_PATH_ENV]
+elif not os.path.isfile(INI_PATH):
     DB_PATH = DEFAULT_DB_PATH
 else:
     config = ConfigParser()
     with open(INI_PATH, "r") as f:
-        ini_file = iter(FakeIniHeader(f))
-        config.read_file(ini_file)
+        config.read_file(chain(["[{}]\n".format(DUMMY_HEAD)], f))
     try:
         DB_PATH = config.get(DUMMY_HEAD, DB_PATH_KEY)
     except NoOptionError:
@@ -53,22 +42,28 @@ else:
 TYPE_MAP = ["white", "black", "white_re", "black_re"]
 
 
-class Domain:
-    """Dataclass for domain whitelist/blacklist entry
+class Domain(namedtuple("Domain", "id_ type_ domain enabled date_added date_modified comment")):
+    """Named tuple for domain whitelist/blacklist entry, one `domainlist` row
 
     Properties:
         id_            (int) : ID of this entry
         type_          (int) : Entry type (black/white; exact/regex)
         domain         (str) : Domain/Regex value
         enabled        (int) : 1 for enabled, 0 for disabled
+        date_added     (int) : Timestamp of creation
+        date_modified  (int) : Timestamp of last modification
         comment        (str) : Comment
         type_str [get] (str) : Type string corresponding to `self.type_`
         is_white [get] (bool): Whether the entry is a whitelist
         is_black [get] (bool): Whether the entry is a blacklist
     """
 
-    def __init__(self, domain):
-        self.id_, self.type_, self.domain, self.enabled, _, _, self.comment = domain
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """`sqlite3` row factory building a `Domain` from a `domainlist` row"""
+        return cls._make(row)
 
     @property
     def type_str(self):
@@ -76,57 +71,117 @@ class Domain:
 
     @property
     def is_white(self):
-        return "white" in self.type_str
+        return not self.type_ & 1
 
     @property
     def is_black(self):
-        return "black" in self.type_str
+        return bool(self.type_ & 1)
 
 
-class Group:
-    """Dataclass for group
+class Group(namedtuple("Group", "gid enabled name date_added date_modified comment")):
+    """Named tuple for group, one `group` row
 
     Properties:
-        gid     (int): Group ID
-        enabled (int): 1 for enabled, 0 for disabled
-        name    (str): Group name
-        comment (str): Comment
+        gid           (int): Group ID
+        enabled       (int): 1 for enabled, 0 for disabled
+        name          (str): Group name
+        date_added    (int): Timestamp of creation
+        date_modified (int): Timestamp of last modification
+        comment       (str): Comment
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """`sqlite3` row factory building a `Group` from a `group` row"""
+        return cls._make(row)
+
+
+def _connect():
+    """Open a new connection to `gravity.db`, with pragmas and indexes set up
+
+    Returns:
+        conn (sqlite3.Connection): The connection to `gravity.db`
     """
 
-    def __init__(self, group):
-        self.gid, self.enabled, self.name, _, _, self.comment = group
+    conn = sqlite3.connect(
+        DB_PATH, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
+    )
+    try:
+        for pragma_stmt in PRAGMA_STMTS:
+            conn.execute(pragma_stmt)
+        with transaction(conn):
+            for index_stmt in INDEX_STMTS:
+                conn.execute(index_stmt)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
 
 
 @contextmanager
-def open_gravity():
-    """Context manager wrapper for `gravity.db` connection
+def open_gravity(conn=None):
+    """Context manager wrapper for `gravity.db` connection. An existing
+    connection is passed through and left open
+
+    Arguments:
+        conn (sqlite3.Connection): Existing connection to reuse, if any
 
     Yields:
         conn (sqlite3.Connection): The connection to `gravity.db`
     """
 
+    if conn is not None:
+        yield conn
+        return
+    conn = _connect()
     try:
-        conn = sqlite3.connect(DB_PATH)
         yield conn
     finally:
-        if conn:
-            conn.close()
+        conn.close()
 
 
-def db_sql(conn, sql):
-    """Run SQL command without preparation
+@contextmanager
+def transaction(conn):
+    """Run the enclosed statements in one explicit transaction. Commits on
+    success and rolls back on error
 
     Arguments:
         conn (sqlite3.Connection): Some connection to sqlite3 database
-        sql  (str)               : SQL command
+
+    Yields:
+        conn (sqlite3.Connection): The same connection
+    """
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def db_sql(conn, sql, parameters=(), row_factory=None):
+    """Run read-only SQL command, optionally with preparation. No transaction
+    is opened, as reads do not need one
+
+    Arguments:
+        conn        (sqlite3.Connection): Some connection to sqlite3 database
+        sql         (str)               : SQL command (template)
+        parameters  (Iterable)          : Parameters for the SQL command template, if any
+        row_factory (Callable)          : Row factory for this cursor only, if any
 
     Returns:
         cursor (sqlite3.Cursor): Cursor returned by SQL execution
     """
 
-    with conn:
-        cursor = conn.execute(sql)
-    return cursor
+    cursor = conn.cursor()
+    if row_factory is not None:
+        cursor.row_factory = row_factory
+    return cursor.execute(sql, parameters)
 
 
 def db_sql_prepare_single(conn, sql, parameters):
@@ -141,7 +196,7 @@ def db_sql_prepare_single(conn, sql, parameters):
         cursor (sqlite3.Cursor): Cursor returned by SQL execution
     """
 
-    with conn:
+    with transaction(conn):
         cursor = conn.execute(sql, parameters)
     return cursor
 
@@ -158,6 +213,51 @@ def db_sql_prepare_multiple(conn, sql, parameters):
         cursor (sqlite3.Cursor): Cursor returned by SQL execution
     """
 
-    with conn:
+    with transaction(conn):
         cursor = conn.executemany(sql, parameters)
     return cursor
+
+
+def sql_placeholders(count):
+    """Build the placeholder list for an `IN (...)` clause
+
+    Arguments:
+        count (int): Number of values to bind
+
+    Returns:
+        placeholders (str): `count` comma-separated `?`s
+    """
+
+    return ",".join("?" * count)
+
+
+def split_chunks(items, size=MAX_SQL_VARIABLES):
+    """Split values to be bound into chunks that fit in one SQL statement
+
+    Arguments:
+        items (Sequence): Values to be bound
+        size  (int)     : Maximum number of values per chunk
+
+    Yields:
+        chunk (Sequence): Consecutive slice of `items`
+    """
+
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def pad_in_list(values, limit=MAX_SQL_VARIABLES):
+    """Pad the values of an `IN (...)` list up to the next power of two, so
+    only a handful of distinct statements are ever prepared and they all stay
+    in the connection's statement cache
+
+    Arguments:
+        values (Sequence): Values to be bound, at least one
+        limit  (int)     : Maximum number of values per statement
+
+    Returns:
+        padded (list): `values` followed by `IN_LIST_SENTINEL`s
+    """
+
+    size = min(1 << (len(values) - 1).bit_length(), limit)
+    return list(values) + [IN_LIST_SENTINEL] * (size - len(values))
@@ -1,11 +1,28 @@
 #!/usr/bin/env python3
 """Common functions"""
 
-from .db_utils import Domain, Group, db_sql
+from .db_utils import Domain, Group, db_sql, split_chunks, sql_placeholders
 
 DOMAIN_LIST_GET_STMT = "SELECT * FROM domainlist"
-GROUP_NAME_GET_STMT = "SELECT * FROM \"group\""
-DOMAIN_GROUP_CORR_GET_STMT = "SELECT * FROM domainlist_by_group"
+DOMAIN_BY_NAME_GET_STMT = "SELECT * FROM domainlist WHERE domain = ?{}"
+DOMAIN_EXISTS_GET_STMT = "SELECT 1 FROM domainlist WHERE domain = ? LIMIT 1"
+GROUP_LIST_GET_STMT = "SELECT * FROM \"group\""
+GROUP_NAMES_GET_STMT = "SELECT name, id FROM \"group\""
+GROUP_IDS_BY_NAMES_GET_STMT = "SELECT name, id FROM \"group\" WHERE name IN ({})"
+DOMAIN_IDS_BY_GROUP_GET_STMT = "SELECT domainlist_id FROM domainlist_by_group WHERE group_id = ?"
+GROUP_DOMAIN_IDS_GET_STMT = (
+    "SELECT domainlist_id FROM domainlist_by_group"
+    " WHERE group_id = (SELECT id FROM \"group\" WHERE name = ?)"
+)
+GROUP_EXISTS_GET_STMT = "SELECT 1 FROM \"group\" WHERE name = ? LIMIT 1"
+GROUP_HAS_DOMAINS_GET_STMT = GROUP_DOMAIN_IDS_GET_STMT + " LIMIT 1"
+GROUP_HAS_MATCHES_GET_STMT = "SELECT 1 FROM domainlist WHERE id IN (" + GROUP_DOMAIN_IDS_GET_STMT + "){} LIMIT 1"
+TYPE_FILTERS = {
+    (True, True): "",
+    (False, True): " AND type IN (0, 2)",
+    (True, False): " AND type IN (1, 3)",
+    (False, False): " AND 0",
+}
 
 
 def filter_domains_by_name(conn, args):
@@ -19,62 +36,43 @@ def filter_domains_by_name(conn, args):
         filtered_data (list[Domain]): List of `Domain` objects for each matching entry
     """
 
-    domains = get_domains(conn)
-    domain_data = [
-        domain for domain in domains if domain.domain == args.domain
-    ]
-    if not domain_data:
+    if not args.domain:
         print("{} is not in domain list".format(args.domain))
         return []
-    filtered_data = filter_domains_by_blackwhite(domain_data, args)
-    return filtered_data
+    cursor = db_sql(
+        conn, DOMAIN_BY_NAME_GET_STMT.format(TYPE_FILTERS[args.b, args.w]), (args.domain,),
+        row_factory=Domain.from_row
+    )
+    filtered_data = cursor.fetchall()
+    if filtered_data:
+        return filtered_data
+    if args.b and args.w or db_sql(conn, DOMAIN_EXISTS_GET_STMT, (args.domain,)).fetchone() is None:
+        print("{} is not in domain list".format(args.domain))
+    elif not args.b:
+        print("{} is not whitelisted".format(args.domain))
+    else:
+        print("{} is not blacklisted".format(args.domain))
+    return []
 
 
-def filter_domains_by_id(conn, args):
-    """Get all blacklist and/or whitelist entries corresponding to the command-line arguments
+def report_unmatched_group(conn, args):
+    """Print why a group has no blacklist and/or whitelist entries matching the
+    command-line arguments. Prints nothing if it does have some
 
     Arguments:
         conn (sqlite3.Connection): Some connection to sqlite3 database
         args (argparse.Namespace): `argparse` result
-
-    Returns:
-        filtered_data (list[Domain]): List of `Domain` objects for each matching entry
     """
 
-    domains = get_domains(conn)
-    domain_data = [domain for domain in domains if domain.id_ in args.ids_]
-    if not domain_data:
-        print("Domains #{} are not in domain list".format(args.ids_))
-        return []
-    filtered_data = filter_domains_by_blackwhite(domain_data, args)
-    return filtered_data
-
-
-def filter_domains_by_blackwhite(domains, args):
-    """Get all blacklist and/or whitelist entries corresponding to the command-line arguments
-
-    Arguments:
-        domains (list[Domain])      : A list of `Domain` objects
-        args    (argparse.Namespace): `argparse` result
-
-    Returns:
-        filtered_data (list[Domain]): List of `Domain` objects for each matching entry
-    """
-    if not args.b:
-        filtered_data = [domain for domain in domains if domain.is_white]
-    elif not args.w:
-        filtered_data = [domain for domain in domains if domain.is_black]
-    else:
-        filtered_data = domains
-    if not filtered_data:
-        if not args.b:
-            print("{} is not whitelisted".format(args.domain))
-        elif not args.w:
-            print("{} is not blacklisted".format(args.domain))
-        else:
-            print("{} is not in domain list".format(args.domain))
-        return []
-    return filtered_data
+    if db_sql(conn, GROUP_EXISTS_GET_STMT, (args.group,)).fetchone() is None:
+        print("{} is not a valid group name".format(args.group))
+    elif db_sql(conn, GROUP_HAS_DOMAINS_GET_STMT, (args.group,)).fetchone() is None:
+        print("No domains are in group {}".format(args.group))
+    elif db_sql(
+        conn, GROUP_HAS_MATCHES_GET_STMT.format(TYPE_FILTERS[args.b, args.w]), (args.group,)
+    ).fetchone() is None:
+        list_name = "blacklisted" if args.b else "whitelisted"
+        print("No {} domains are in group {}".format(list_name, args.group))
 
 
 def get_domains(conn):
@@ -87,9 +85,8 @@ def get_domains(conn):
         time_removed (list[Domain]): List of `Domain` objects for each entry
     """
 
-    cursor = db_sql(conn, DOMAIN_LIST_GET_STMT)
-    all_domains = cursor.fetchall()
-    time_removed = [Domain(domain) for domain in all_domains]
+    cursor = db_sql(conn, DOMAIN_LIST_GET_STMT, row_factory=Domain.from_row)
+    time_removed = cursor.fetchall()
     return time_removed
 
 
@@ -103,9 +100,8 @@ def get_groups(conn):
         time_removed (list[Group]): List of `Group` objects for each entry
     """
 
-    cursor = db_sql(conn, GROUP_NAME_GET_STMT)
-    all_groups = cursor.fetchall()
-    time_removed = [Group(group) for group in all_groups]
+    cursor = db_sql(conn, GROUP_LIST_GET_STMT, row_factory=Group.from_row)
+    time_removed = cursor.fetchall()
     return time_removed
 
 
@@ -119,11 +115,28 @@ def get_group_names(conn):
         group_names (dict[str, int]): Dictionary mapping group name to group id
     """
 
-    groups = get_groups(conn)
-    group_names = {group.name: group.gid for group in groups}
+    cursor = db_sql(conn, GROUP_NAMES_GET_STMT)
+    group_names = dict(cursor)
     return group_names
 
 
+def get_group_ids_by_names(conn, names):
+    """Look up only the given group names, leaving the rest of the table unread
+
+    Arguments:
+        conn  (sqlite3.Connection): Some connection to sqlite3 database
+        names (Iterable[str])     : Group names to look up
+
+    Returns:
+        group_ids (dict[str, int]): Dictionary mapping each existing group name to its id
+    """
+
+    group_ids = {}
+    for chunk in split_chunks(tuple(set(names))):
+        group_ids.update(db_sql(conn, GROUP_IDS_BY_NAMES_GET_STMT.format(sql_placeholders(len(chunk))), chunk))
+    return group_ids
+
+
 def get_domain_ids_by_group_ids(conn, gid):
     """Get IDs of domains under a group by Group ID
 
@@ -134,9 +147,6 @@ def get_domain_ids_by_group_ids(conn, gid):
     Returns:
         domain_ids (set[int]): Set of Domain IDs in the group
     """
-    cursor = db_sql(conn, DOMAIN_GROUP_CORR_GET_STMT)
-    all_corr = cursor.fetchall()
-    domain_ids = {
-        domain_id for domain_id, group_id in all_corr if group_id == gid
-    }
+    cursor = db_sql(conn, DOMAIN_IDS_BY_GROUP_GET_STMT, (gid,))
+    domain_ids = {domain_id for domain_id, in cursor}
     return domain_ids
@@ -16,39 +16,29 @@ optional arguments:
 
 import argparse
 
-from .db_utils import open_gravity, db_sql_prepare_multiple
-from .get_data import filter_domains_by_id, get_domain_ids_by_group_ids, get_group_names
+from .db_utils import open_gravity, transaction
+from .get_data import GROUP_DOMAIN_IDS_GET_STMT, TYPE_FILTERS, report_unmatched_group
+from .toggle_common import add_toggle_args, resolve_toggle_args, toggle_stmt
 
-DOMAIN_TOGGLE_STMT = "UPDATE domainlist SET enabled = ?, comment = ?, type = ? WHERE id = ?"
 
-
-class FilterDomainByIDArgs:
-    """Args class for argument object for domain id processing
-
-    Properties:
-        ids_ (set[int]): Domain/Regex IDs
-        b    (bool)    : Whether blacklists will be processed
-        w    (bool)    : Whether whitelists will be processed
-    """
-
-    def __init__(self, ids_, b, w):
-        self.ids_ = ids_
-        self.b = b
-        self.w = w
-
-
-def update_db(conn, domains):
-    """Do the update in database
+def update_group_domains(conn, args):
+    """Do the update in database, with a single statement selecting the
+    domains of the group itself
 
     Arguments:
-        conn    (sqlite3.Connection): Some connection to sqlite3 database
-        domains (list[Domain])      : List of `Domain` objects for each entry
+        conn (sqlite3.Connection): Some connection to sqlite3 database
+        args (argparse.Namespace): Parsed arguments
+
+    Returns:
+        count (int): Number of entries updated
     """
 
-    update_parameters = [(
-        domain.enabled ^ 1, domain.comment, domain.type_, domain.id_
-    ) for domain in domains]
-    db_sql_prepare_multiple(conn, DOMAIN_TOGGLE_STMT, update_parameters)
+    stmt, prefix = toggle_stmt(args.t)
+    with transaction(conn):
+        cursor = conn.execute(
+            stmt.format(GROUP_DOMAIN_IDS_GET_STMT) + TYPE_FILTERS[args.b, args.w], prefix + [args.group]
+        )
+    return cursor.rowcount
 
 
 def parse_args(argv):
@@ -68,56 +58,20 @@ def parse_args(argv):
         "group",
         help="group to be toggled"
     )
-    parser.add_argument(
-        "toggle",
-        choices=("e", "d", "t", "enable", "disable", "toggle"),
-        help="enable/disable domains in the group"
-    )
-    parser.add_argument(
-        "-b",
-        action="store_true",
-        help="blacklist only"
-    )
-    parser.add_argument(
-        "-w",
-        action="store_true",
-        help="whitelist only"
-    )
+    add_toggle_args(parser, "enable/disable domains in the group")
     args = parser.parse_args(argv)
-    if not args.b and not args.w:
-        args.b = args.w = True
-    if args.toggle in ("t", "toggle"):
-        args.t = -1
-    else:
-        args.t = int(args.toggle in ("e", "enable"))
+    resolve_toggle_args(args)
     return args
 
 
-def main(argv):
+def main(argv, conn=None):
     """Main function for `toggle_domain`
 
     Arguments:
-        argv (list[str]): Args from command-line
+        argv (list[str])         : Args from command-line
+        conn (sqlite3.Connection): Existing connection to reuse, if any
     """
     args = parse_args(argv)
-    with open_gravity() as conn:
-        groups = get_group_names(conn)
-        if args.group not in groups:
-            print("{} is not a valid group name".format(args.group))
-            return
-        group_id = groups[args.group]
-        domain_ids = get_domain_ids_by_group_ids(conn, group_id)
-        if not domain_ids:
-            print("No domains are in group {}".format(args.group))
-            return
-        new_args = FilterDomainByIDArgs(domain_ids, args.b, args.w)
-        filtered_data = filter_domains_by_id(conn, new_args)
-        if not filtered_data:
-            return
-        if args.t == -1:
-            domains_2_change = filtered_data
-        else:
-            domains_2_change = [
-                domain for domain in filtered_data if domain.enabled != args.t
-            ]
-        update_db(conn, domains_2_change)
+    with open_gravity(conn) as conn:
+        if not update_group_domains(conn, args):
+            report_unmatched_group(conn, args)
@@ -14,26 +14,37 @@ optional arguments:
 """
 
 import argparse
+from itertools import chain
 
-from .db_utils import open_gravity, db_sql_prepare_single, db_sql_prepare_multiple
-from .get_data import filter_domains_by_name, get_group_names
+from .db_utils import open_gravity, transaction, pad_in_list, split_chunks, sql_placeholders, MAX_SQL_VARIABLES
+from .get_data import filter_domains_by_name, get_group_ids_by_names
 
-GROUP_REMOVE_STMT = "DELETE FROM domainlist_by_group WHERE domainlist_id = ?"
-GROUP_INSERT_STMT = "INSERT INTO domainlist_by_group (domainlist_id, group_id) VALUES (?, ?)"
+GROUP_CURRENT_STMT = "SELECT domainlist_id, group_id FROM domainlist_by_group WHERE domainlist_id IN ({})"
+GROUP_REMOVE_STMT = "DELETE FROM domainlist_by_group WHERE domainlist_id = ? AND group_id = ?"
+GROUP_INSERT_STMT = "INSERT INTO domainlist_by_group (domainlist_id, group_id) VALUES {}"
+GROUP_INSERT_VALUE = "(?, ?)"
 
 
-def update_db(conn, id_, groups):
-    """Do the update in database
+def update_db(conn, ids, groups):
+    """Do the update in database, in a single transaction. Only the group
+    assignments that differ from the current ones are written
 
     Arguments:
         conn    (sqlite3.Connection): Some connection to sqlite3 database
-        id_     (int)               : ID of whitelist/blacklist entry
-        domains (Iterable[int])     : List of group IDs to which the entry is moved
+        ids     (list[int])         : IDs of whitelist/blacklist entries
+        groups  (Iterable[int])     : List of group IDs to which the entries are moved
     """
 
-    db_sql_prepare_single(conn, GROUP_REMOVE_STMT, (id_,))
-    insert_parameters = [(id_, gid) for gid in groups]
-    db_sql_prepare_multiple(conn, GROUP_INSERT_STMT, insert_parameters)
+    wanted = {(id_, gid) for id_ in ids for gid in groups}
+    current = set()
+    with transaction(conn):
+        for chunk in split_chunks(ids):
+            chunk = pad_in_list(chunk)
+            current.update(conn.execute(GROUP_CURRENT_STMT.format(sql_placeholders(len(chunk))), chunk))
+        conn.executemany(GROUP_REMOVE_STMT, sorted(current - wanted))
+        for chunk in split_chunks(sorted(wanted - current), MAX_SQL_VARIABLES // 2):
+            values = ", ".join([GROUP_INSERT_VALUE] * len(chunk))
+            conn.execute(GROUP_INSERT_STMT.format(values), list(chain.from_iterable(chunk)))
 
 
 def parse_args(argv):
@@ -75,26 +86,25 @@ def parse_args(argv):
     return args
 
 
-def main(argv):
+def main(argv, conn=None):
     """Main function for `update_group`
 
     Arguments:
-        argv (list[str]): Args from command-line
+        argv (list[str])         : Args from command-line
+        conn (sqlite3.Connection): Existing connection to reuse, if any
     """
     args = parse_args(argv)
-    with open_gravity() as conn:
-        groups = get_group_names(conn)
-        group_ids = set()
-        for g in args.g:
-            if g not in groups:
-                print("{} is not a valid group name".format(g))
-                return
-            group_ids.add(groups[g])
+    with open_gravity(conn) as conn:
+        groups = get_group_ids_by_names(conn, args.g)
+        missing = [g for g in args.g if g not in groups]
+        if missing:
+            print("{} is not a valid group name".format(missing[0]))
+            return
+        group_ids = {groups[g] for g in args.g}
         filtered_data = filter_domains_by_name(conn, args)
         if not filtered_data:
             return
-        for domain in filtered_data:
-            update_db(conn, domain.id_, group_ids)
+        update_db(conn, [domain.id_ for domain in filtered_data], group_ids)
 
 
 if __name__ == "__main__":
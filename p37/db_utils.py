@@ -2,80 +2,87 @@
 """sqlite3 database utility functions"""
 
 import sqlite3
-import os.path
-from io import TextIOWrapper
+import os
 from configparser import ConfigParser, NoOptionError
 from contextlib import contextmanager
-from typing import Iterable, Tuple
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 INI_PATH = "/etc/pihole/pihole-FTL.conf"
 DB_PATH_KEY = "GRAVITYDB"
+DB_PATH_ENV = "PIHOLE_GRAVITY_DB"
 DEFAULT_DB_PATH = "/etc/pihole/gravity.db"
 DUMMY_HEAD = "DummyHead"
-
-
-class FakeIniHeader:
-    """Pihole config wrapper. Adds dummy section head that `ConfigParser`
-    requires
-
-    Properties:
-        file      (io.TextIOWrapper): The actual file hander
-        head_read (bool)            : Whether the section head is read
-    """
-
-    def __init__(self, file: TextIOWrapper) -> None:
-        self.file = file
-        self.head_read: bool
-
-    def __iter__(self) -> str:
-        self.head_read = False
-        return self
-
-    def __next__(self) -> str:
-        if not self.head_read:
-            self.head_read = True
-            return f"[{DUMMY_HEAD}]\n"
-        line = self.file.readline()
-        if not line:
-            raise StopIteration
-        return line
+# `domainlist(domain, type)`, `"group"(name)` and
+#   `domainlist_by_group(domainlist_id, group_id)` are already indexed by their
+#   `UNIQUE`/`PRIMARY KEY` constraints; only lookups by group need an index
+INDEX_STMTS = (
+    "CREATE INDEX IF NOT EXISTS idx_domainlist_by_group_group_id_domainlist_id ON domainlist_by_group(group_id, domainlist_id)",
+)
+# Only settings lasting for this connection. The journal mode is stored in the
+#   file and left alone, as pihole-FTL (running as another user) owns it
+PRAGMA_STMTS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=134217728",
+)
+# SQLite refuses statements binding more variables than this (the default
+#   `SQLITE_MAX_VARIABLE_NUMBER` before SQLite 3.32)
+MAX_SQL_VARIABLES = 999
+STATEMENT_CACHE_SIZE = 256
+# Padding for `IN (...)` lists. Row IDs are positive, so it never matches
+IN_LIST_SENTINEL = -1
 
 
 # Read `pihole` config to see if there's an alternative path
-#   for `gravity.db`
-if not os.path.isfile(INI_PATH):
+#   for `gravity.db`, unless the environment already names one
+if os.environ.get(DB_PATH_ENV):
+    DB_PATH = os.environ[DB_PATH_ENV]
+elif not os.path.isfile(INI_PATH):
     DB_PATH = DEFAULT_DB_PATH
 else:
     config = ConfigParser()
     with open(INI_PATH, "r") as f:
-        ini_file = iter(FakeIniHeader(f))
-        config.read_file(ini_file)
+        # `ConfigParser` requires a section head, which the pihole config lacks
+        config.read_file(chain([f"[{DUMMY_HEAD}]\n"], f))
     try:
         DB_PATH = config.get(DUMMY_HEAD, DB_PATH_KEY)
     except NoOptionError:
         DB_PATH = DEFAULT_DB_PATH
 
 # Map type number to respective nicknames
-#   0 -> "white" and so on
+#   0 -> "white" and so on. Odd types are blacklists, even types whitelists
 TYPE_MAP = ["white", "black", "white_re", "black_re"]
 
 
-class Domain:
-    """Dataclass for domain whitelist/blacklist entry
+class Domain(NamedTuple):
+    """Named tuple for domain whitelist/blacklist entry, one `domainlist` row
 
     Properties:
         id_            (int) : ID of this entry
         type_          (int) : Entry type (black/white; exact/regex)
         domain         (str) : Domain/Regex value
         enabled        (int) : 1 for enabled, 0 for disabled
+        date_added     (int) : Timestamp of creation
+        date_modified  (int) : Timestamp of last modification
         comment        (str) : Comment
         type_str [get] (str) : Type string corresponding to `self.type_`
         is_white [get] (bool): Whether the entry is a whitelist
         is_black [get] (bool): Whether the entry is a blacklist
     """
 
-    def __init__(self, domain: Tuple[int, int, str, int, int, int, str]) -> None:
-        self.id_, self.type_, self.domain, self.enabled, _, _, self.comment = domain
+    id_: int
+    type_: int
+    domain: str
+    enabled: int
+    date_added: int
+    date_modified: int
+    comment: Optional[str]
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: Tuple[int, int, str, int, int, int, str]) -> "Domain":
+        """`sqlite3` row factory building a `Domain` from a `domainlist` row"""
+        return cls._make(row)
 
     @property
     def type_str(self) -> str:
@@ -83,57 +90,131 @@ class Domain:
 
     @property
     def is_white(self) -> bool:
-        return "white" in self.type_str
+        return not self.type_ & 1
 
     @property
     def is_black(self) -> bool:
-        return "black" in self.type_str
+        return bool(self.type_ & 1)
 
 
-class Group:
-    """Dataclass for group
+class Group(NamedTuple):
+    """Named tuple for group, one `group` row
 
     Properties:
-        gid     (int): Group ID
-        enabled (int): 1 for enabled, 0 for disabled
-        name    (str): Group name
-        comment (str): Comment
+        gid           (int): Group ID
+        enabled       (int): 1 for enabled, 0 for disabled
+        name          (str): Group name
+        date_added    (int): Timestamp of creation
+        date_modified (int): Timestamp of last modification
+        comment       (str): Comment
+    """
+
+    gid: int
+    enabled: int
+    name: str
+    date_added: int
+    date_modified: int
+    comment: Optional[str]
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: Tuple[int, int, str, int, int, str]) -> "Group":
+        """`sqlite3` row factory building a `Group` from a `group` row"""
+        return cls._make(row)
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a new connection to `gravity.db`, with pragmas and indexes set up
+
+    Returns:
+        conn (sqlite3.Connection): The connection to `gravity.db`
     """
 
-    def __init__(self, group: Tuple[int, int, str, int, int, str]) -> None:
-        self.gid, self.enabled, self.name, _, _, self.comment = group
+    # Autocommit mode; transactions are opened explicitly by `transaction`
+    conn = sqlite3.connect(
+        DB_PATH, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
+    )
+    try:
+        for pragma_stmt in PRAGMA_STMTS:
+            conn.execute(pragma_stmt)
+        # Make sure the columns we look up by are indexed
+        with transaction(conn):
+            for index_stmt in INDEX_STMTS:
+                conn.execute(index_stmt)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
 
 
 @contextmanager
-def open_gravity():
-    """Context manager wrapper for `gravity.db` connection
+def open_gravity(conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Connection]:
+    """Context manager wrapper for `gravity.db` connection. An existing
+    connection is passed through and left open
+
+    Arguments:
+        conn (sqlite3.Connection): Existing connection to reuse, if any
 
     Yields:
         conn (sqlite3.Connection): The connection to `gravity.db`
     """
 
+    if conn is not None:
+        yield conn
+        return
+    conn = _connect()
     try:
-        conn = sqlite3.connect(DB_PATH)
         yield conn
     finally:
-        if conn:
-            conn.close()
+        conn.close()
 
 
-def db_sql(conn: sqlite3.Connection, sql: str) -> sqlite3.Cursor:
-    """Run SQL command without preparation
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Run the enclosed statements in one explicit transaction. Commits on
+    success and rolls back on error
 
     Arguments:
         conn (sqlite3.Connection): Some connection to sqlite3 database
-        sql  (str)               : SQL command
+
+    Yields:
+        conn (sqlite3.Connection): The same connection
+    """
+
+    # Take the write lock up front rather than promoting a read lock later
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        # SQLite may already have rolled back by itself, e.g. on a full disk
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def db_sql(
+    conn: sqlite3.Connection,
+    sql: str,
+    parameters: Iterable = (),
+    row_factory: Optional[Callable[[sqlite3.Cursor, tuple], Any]] = None
+) -> sqlite3.Cursor:
+    """Run read-only SQL command, optionally with preparation. No transaction
+    is opened, as reads do not need one
+
+    Arguments:
+        conn        (sqlite3.Connection): Some connection to sqlite3 database
+        sql         (str)               : SQL command (template)
+        parameters  (Iterable)          : Parameters for the SQL command template, if any
+        row_factory (Callable)          : Row factory for this cursor only, if any
 
     Returns:
         cursor (sqlite3.Cursor): Cursor returned by SQL execution
     """
 
-    with conn:
-        cursor = conn.execute(sql)
-    return cursor
+    cursor = conn.cursor()
+    if row_factory is not None:
+        cursor.row_factory = row_factory
+    return cursor.execute(sql, parameters)
 
 
 def db_sql_prepare_single(conn: sqlite3.Connection, sql: str, parameters: Iterable) -> sqlite3.Cursor:
@@ -148,7 +229,7 @@ def db_sql_prepare_single(conn: sqlite3.Connection, sql: str, parameters: Iterab
         cursor (sqlite3.Cursor): Cursor returned by SQL execution
     """
 
-    with conn:
+    with transaction(conn):
         cursor = conn.execute(sql, parameters)
     return cursor
 
@@ -165,6 +246,51 @@ def db_sql_prepare_multiple(conn: sqlite3.Connection, sql: str, parameters: Iter
         cursor (sqlite3.Cursor): Cursor returned by SQL execution
     """
 
-    with conn:
+    with transaction(conn):
         cursor = conn.executemany(sql, parameters)
     return cursor
+
+
+def sql_placeholders(count: int) -> str:
+    """Build the placeholder list for an `IN (...)` clause
+
+    Arguments:
+        count (int): Number of values to bind
+
+    Returns:
+        placeholders (str): `count` comma-separated `?`s
+    """
+
+    return ",".join("?" * count)
+
+
+def split_chunks(items: Sequence, size: int = MAX_SQL_VARIABLES) -> Iterator[Sequence]:
+    """Split values to be bound into chunks that fit in one SQL statement
+
+    Arguments:
+        items (Sequence): Values to be bound
+        size  (int)     : Maximum number of values per chunk
+
+    Yields:
+        chunk (Sequence): Consecutive slice of `items`
+    """
+
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def pad_in_list(values: Sequence, limit: int = MAX_SQL_VARIABLES) -> List:
+    """Pad the values of an `IN (...)` list up to the next power of two, so
+    only a handful of distinct statements are ever prepared and they all stay
+    in the connection's statement cache
+
+    Arguments:
+        values (Sequence): Values to be bound, at least one
+        limit  (int)     : Maximum number of values per statement
+
+    Returns:
+        padded (list): `values` followed by `IN_LIST_SENTINEL`s
+    """
+
+    size = min(1 << (len(values) - 1).bit_length(), limit)
+    return list(values) + [IN_LIST_SENTINEL] * (size - len(values))
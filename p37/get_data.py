@@ -3,13 +3,32 @@
 
 import sqlite3
 from argparse import Namespace
-from typing import List, Tuple, Dict, Set
+from typing import Dict, Iterable, List, Set
 
-from .db_utils import Domain, Group, db_sql
+from .db_utils import Domain, Group, db_sql, split_chunks, sql_placeholders
 
 DOMAIN_LIST_GET_STMT = "SELECT * FROM domainlist"
-GROUP_NAME_GET_STMT = "SELECT * FROM \"group\""
-DOMAIN_GROUP_CORR_GET_STMT = "SELECT * FROM domainlist_by_group"
+DOMAIN_BY_NAME_GET_STMT = "SELECT * FROM domainlist WHERE domain = ?{}"
+DOMAIN_EXISTS_GET_STMT = "SELECT 1 FROM domainlist WHERE domain = ? LIMIT 1"
+GROUP_LIST_GET_STMT = "SELECT * FROM \"group\""
+GROUP_NAMES_GET_STMT = "SELECT name, id FROM \"group\""
+GROUP_IDS_BY_NAMES_GET_STMT = "SELECT name, id FROM \"group\" WHERE name IN ({})"
+DOMAIN_IDS_BY_GROUP_GET_STMT = "SELECT domainlist_id FROM domainlist_by_group WHERE group_id = ?"
+GROUP_DOMAIN_IDS_GET_STMT = (
+    "SELECT domainlist_id FROM domainlist_by_group"
+    " WHERE group_id = (SELECT id FROM \"group\" WHERE name = ?)"
+)
+GROUP_EXISTS_GET_STMT = "SELECT 1 FROM \"group\" WHERE name = ? LIMIT 1"
+GROUP_HAS_DOMAINS_GET_STMT = GROUP_DOMAIN_IDS_GET_STMT + " LIMIT 1"
+GROUP_HAS_MATCHES_GET_STMT = "SELECT 1 FROM domainlist WHERE id IN (" + GROUP_DOMAIN_IDS_GET_STMT + "){} LIMIT 1"
+# Extra `WHERE` condition for the blacklist/whitelist flags, keyed by `(b, w)`.
+#   Types 0 and 2 are whitelists; types 1 and 3 are blacklists
+TYPE_FILTERS = {
+    (True, True): "",
+    (False, True): " AND type IN (0, 2)",
+    (True, False): " AND type IN (1, 3)",
+    (False, False): " AND 0",
+}
 
 
 class CommonArgsDummy(Namespace):
@@ -39,18 +58,18 @@ class DomainCommonArgsDummy(CommonArgsDummy):
         self.domain: str
 
 
-class IDCommonArgsDummy(CommonArgsDummy):
-    """Dummy class for argument object for domain id processing.
+class GroupCommonArgsDummy(CommonArgsDummy):
+    """Dummy class for argument object for group name processing.
     Used only for type notation
 
     Properties:
-        ids_ (set[int]): Domain/Regex ID
-        b    (bool)    : Whether blacklists will be processed
-        w    (bool)    : Whether whitelists will be processed
+        group (str) : Group name
+        b     (bool): Whether blacklists will be processed
+        w     (bool): Whether whitelists will be processed
     """
 
     def __init__(self) -> None:
-        self.ids_: Set[int]
+        self.group: str
 
 
 def filter_domains_by_name(conn: sqlite3.Connection, args: DomainCommonArgsDummy) -> List[Domain]:
@@ -64,62 +83,44 @@ def filter_domains_by_name(conn: sqlite3.Connection, args: DomainCommonArgsDummy
         filtered_data (list[Domain]): List of `Domain` objects for each matching entry
     """
 
-    domains = get_domains(conn)
-    domain_data = [
-        domain for domain in domains if domain.domain == args.domain
-    ]
-    if not domain_data:
+    if not args.domain:
         print(f"{args.domain} is not in domain list")
         return []
-    filtered_data = filter_domains_by_blackwhite(domain_data, args)
-    return filtered_data
+    cursor = db_sql(
+        conn, DOMAIN_BY_NAME_GET_STMT.format(TYPE_FILTERS[args.b, args.w]), (args.domain,),
+        row_factory=Domain.from_row
+    )
+    filtered_data: List[Domain] = cursor.fetchall()
+    if filtered_data:
+        return filtered_data
+    # Only work out why nothing matched when nothing did
+    if args.b and args.w or db_sql(conn, DOMAIN_EXISTS_GET_STMT, (args.domain,)).fetchone() is None:
+        print(f"{args.domain} is not in domain list")
+    elif not args.b:
+        print(f"{args.domain} is not whitelisted")
+    else:
+        print(f"{args.domain} is not blacklisted")
+    return []
 
 
-def filter_domains_by_id(conn: sqlite3.Connection, args: IDCommonArgsDummy) -> List[Domain]:
-    """Get all blacklist and/or whitelist entries corresponding to the command-line arguments
+def report_unmatched_group(conn: sqlite3.Connection, args: GroupCommonArgsDummy) -> None:
+    """Print why a group has no blacklist and/or whitelist entries matching the
+    command-line arguments. Prints nothing if it does have some
 
     Arguments:
         conn (sqlite3.Connection): Some connection to sqlite3 database
         args (argparse.Namespace): `argparse` result
-
-    Returns:
-        filtered_data (list[Domain]): List of `Domain` objects for each matching entry
     """
 
-    domains = get_domains(conn)
-    domain_data = [domain for domain in domains if domain.id_ in args.ids_]
-    if not domain_data:
-        print(f"Domains #{args.ids_} are not in domain list")
-        return []
-    filtered_data = filter_domains_by_blackwhite(domain_data, args)
-    return filtered_data
-
-
-def filter_domains_by_blackwhite(domains: List[Domain], args: CommonArgsDummy) -> List[Domain]:
-    """Get all blacklist and/or whitelist entries corresponding to the command-line arguments
-
-    Arguments:
-        domains (list[Domain])      : A list of `Domain` objects
-        args    (argparse.Namespace): `argparse` result
-
-    Returns:
-        filtered_data (list[Domain]): List of `Domain` objects for each matching entry
-    """
-    if not args.b:
-        filtered_data = [domain for domain in domains if domain.is_white]
-    elif not args.w:
-        filtered_data = [domain for domain in domains if domain.is_black]
-    else:
-        filtered_data = domains
-    if not filtered_data:
-        if not args.b:
-            print(f"{args.domain} is not whitelisted")
-        elif not args.w:
-            print(f"{args.domain} is not blacklisted")
-        else:
-            print(f"{args.domain} is not in domain list")
-        return []
-    return filtered_data
+    if db_sql(conn, GROUP_EXISTS_GET_STMT, (args.group,)).fetchone() is None:
+        print(f"{args.group} is not a valid group name")
+    elif db_sql(conn, GROUP_HAS_DOMAINS_GET_STMT, (args.group,)).fetchone() is None:
+        print(f"No domains are in group {args.group}")
+    elif db_sql(
+        conn, GROUP_HAS_MATCHES_GET_STMT.format(TYPE_FILTERS[args.b, args.w]), (args.group,)
+    ).fetchone() is None:
+        list_name = "blacklisted" if args.b else "whitelisted"
+        print(f"No {list_name} domains are in group {args.group}")
 
 
 def get_domains(conn: sqlite3.Connection) -> List[Domain]:
@@ -132,11 +133,8 @@ def get_domains(conn: sqlite3.Connection) -> List[Domain]:
         time_removed (list[Domain]): List of `Domain` objects for each entry
     """
 
-    cursor = db_sql(conn, DOMAIN_LIST_GET_STMT)
-    all_domains: List[
-        Tuple[int, int, str, int, int, int, str]
-    ] = cursor.fetchall()
-    time_removed = [Domain(domain) for domain in all_domains]
+    cursor = db_sql(conn, DOMAIN_LIST_GET_STMT, row_factory=Domain.from_row)
+    time_removed: List[Domain] = cursor.fetchall()
     return time_removed
 
 
@@ -150,9 +148,8 @@ def get_groups(conn: sqlite3.Connection) -> List[Group]:
         time_removed (list[Group]): List of `Group` objects for each entry
     """
 
-    cursor = db_sql(conn, GROUP_NAME_GET_STMT)
-    all_groups: List[Tuple[int, int, str, int, int, str]] = cursor.fetchall()
-    time_removed = [Group(group) for group in all_groups]
+    cursor = db_sql(conn, GROUP_LIST_GET_STMT, row_factory=Group.from_row)
+    time_removed: List[Group] = cursor.fetchall()
     return time_removed
 
 
@@ -166,11 +163,29 @@ def get_group_names(conn: sqlite3.Connection) -> Dict[str, int]:
         group_names (dict[str, int]): Dictionary mapping group name to group id
     """
 
-    groups = get_groups(conn)
-    group_names = {group.name: group.gid for group in groups}
+    cursor = db_sql(conn, GROUP_NAMES_GET_STMT)
+    group_names: Dict[str, int] = dict(cursor)
     return group_names
 
 
+def get_group_ids_by_names(conn: sqlite3.Connection, names: Iterable[str]) -> Dict[str, int]:
+    """Look up only the given group names, leaving the rest of the table unread
+
+    Arguments:
+        conn  (sqlite3.Connection): Some connection to sqlite3 database
+        names (Iterable[str])     : Group names to look up
+
+    Returns:
+        group_ids (dict[str, int]): Dictionary mapping each existing group name to its id
+    """
+
+    group_ids: Dict[str, int] = {}
+    # Not padded: a padding value could match an actual group name
+    for chunk in split_chunks(tuple(set(names))):
+        group_ids.update(db_sql(conn, GROUP_IDS_BY_NAMES_GET_STMT.format(sql_placeholders(len(chunk))), chunk))
+    return group_ids
+
+
 def get_domain_ids_by_group_ids(conn: sqlite3.Connection, gid: int) -> Set[int]:
     """Get IDs of domains under a group by Group ID
 
@@ -181,9 +196,6 @@ def get_domain_ids_by_group_ids(conn: sqlite3.Connection, gid: int) -> Set[int]:
     Returns:
         domain_ids (set[int]): Set of Domain IDs in the group
     """
-    cursor = db_sql(conn, DOMAIN_GROUP_CORR_GET_STMT)
-    all_corr: List[Tuple[int, int]] = cursor.fetchall()
-    domain_ids = {
-        domain_id for domain_id, group_id in all_corr if group_id == gid
-    }
+    cursor = db_sql(conn, DOMAIN_IDS_BY_GROUP_GET_STMT, (gid,))
+    domain_ids = {domain_id for domain_id, in cursor}
     return domain_ids
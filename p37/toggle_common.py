@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Functions shared by `toggle_domain` and `toggle_group`"""
+
+import argparse
+from sqlite3 import Connection
+from typing import List, Tuple
+
+from .db_utils import transaction, pad_in_list, split_chunks, sql_placeholders, MAX_SQL_VARIABLES
+
+DOMAIN_TOGGLE_STMT = "UPDATE domainlist SET enabled = 1 - enabled WHERE id IN ({})"
+DOMAIN_SET_STMT = "UPDATE domainlist SET enabled = ? WHERE enabled != ? AND id IN ({})"
+# Value of `t` for each `toggle` choice: 1 for enable; 0 for disable; -1 for toggle
+TOGGLE_MAP = {"e": 1, "d": 0, "t": -1, "enable": 1, "disable": 0, "toggle": -1}
+TOGGLE_CHOICES = ("e", "d", "t", "enable", "disable", "toggle")
+
+
+def toggle_stmt(t: int) -> Tuple[str, List[int]]:
+    """Pick the `UPDATE` statement for a toggle
+
+    Arguments:
+        t (int): 1 for enable; 0 for disable; -1 for toggle
+
+    Returns:
+        stmt   (str)      : `UPDATE` template, to be formatted with the `IN (...)` contents
+        prefix (list[int]): Parameters bound before those of the `IN (...)` contents
+    """
+
+    if t == -1:
+        return DOMAIN_TOGGLE_STMT, []
+    return DOMAIN_SET_STMT, [t, t]
+
+
+def update_db(conn: Connection, ids: List[int], t: int) -> None:
+    """Do the update in database
+
+    Arguments:
+        conn (sqlite3.Connection): Some connection to sqlite3 database
+        ids  (list[int])         : IDs of the entries to be updated
+        t    (int)               : 1 for enable; 0 for disable; -1 for toggle
+    """
+
+    stmt, prefix = toggle_stmt(t)
+    size = MAX_SQL_VARIABLES - len(prefix)
+    with transaction(conn):
+        for chunk in split_chunks(ids, size):
+            chunk = pad_in_list(chunk, size)
+            conn.execute(stmt.format(sql_placeholders(len(chunk))), prefix + chunk)
+
+
+def add_toggle_args(parser: argparse.ArgumentParser, toggle_help: str) -> None:
+    """Add the `toggle` positional argument and the `-b`/`-w` flags
+
+    Arguments:
+        parser      (argparse.ArgumentParser): Parser of a toggle command
+        toggle_help (str)                    : Help text of the `toggle` argument
+    """
+
+    parser.add_argument(
+        "toggle",
+        choices=TOGGLE_CHOICES,
+        help=toggle_help
+    )
+    parser.add_argument(
+        "-b",
+        action="store_true",
+        help="blacklist only"
+    )
+    parser.add_argument(
+        "-w",
+        action="store_true",
+        help="whitelist only"
+    )
+
+
+def resolve_toggle_args(args: argparse.Namespace) -> None:
+    """Fill in the arguments derived from the parsed ones: both lists when
+    neither `-b` nor `-w` is given, and `t` from `toggle`
+
+    Arguments:
+        args (argparse.Namespace): Parsed arguments, updated in place
+    """
+
+    if not args.b and not args.w:
+        args.b = args.w = True
+    args.t = TOGGLE_MAP[args.toggle]
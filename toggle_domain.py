@@ -10,14 +10,29 @@ if major < 3:
     sys.exit(23)
 if minor < 5:
     print("W: Python 3.4 and below are not tested. Errors may occur")
-if minor < 7:
-    from p35.toggle_domain import main
-else:
-    from p37.toggle_domain import main
 
 
 def tmain() -> None:
     args = sys.argv[1:]
+    backend = "p35" if minor < 7 else "p37"
+    options = args[:args.index("--")] if "--" in args else args
+    if "-h" in options or "--help" in options:
+        # The usage text is the backend's docstring. Read it from source, so
+        #   argparse, sqlite3 and the gravity config are never loaded. Keep it
+        #   (and its copy in README.md) in step with the backend's `parse_args`
+        import ast
+        import os
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), backend, "toggle_domain.py")
+        with open(path, "r") as f:
+            usage = ast.get_docstring(ast.parse(f.read()), clean=False)
+        if usage is not None:
+            print(usage, end="")
+            sys.exit(0)
+    # Import the backend only when running, after the version check
+    if minor < 7:
+        from p35.toggle_domain import main
+    else:
+        from p37.toggle_domain import main
     main(args)
 
 